@@ -1,91 +1,293 @@
+import contextlib
 import csv
+import io
 import json
+import os
 import re
 import sys
-from typing import Dict, List, Tuple, Any
+from itertools import islice
+from multiprocessing import Pool
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    cast,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ahocorasick  # type: ignore[import-not-found]
+except ImportError:
+    ahocorasick = None  # type: ignore[assignment]
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+_LONG_DIGITS = re.compile(r"\d{19,}")
+
+
+def _loads(data: str) -> Tuple[Any, Callable[[Any], str]]:
+    # orjson turns integers outside the 64-bit range into floats, so any
+    # record with a long digit run is left to the stdlib.
+    if orjson is not None and _LONG_DIGITS.search(data) is None:
+        try:
+            return orjson.loads(data), _orjson_dumps
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity; let the stdlib parse and write them.
+            pass
+    return json.loads(data), _json_dumps
+
+
+_PHONE_RE = r"\d{10}"
+_AADHAR_RE = r"\d{12}"
+_PASSPORT_RE = r"[A-Z]\d{7}"
+_UPI_RE = r"[\w.-]+@[\w.-]+"
+
+_PHONE_PATTERN = re.compile(f"^{_PHONE_RE}$", re.ASCII)
+_AADHAR_PATTERN = re.compile(f"^{_AADHAR_RE}$", re.ASCII)
+_PASSPORT_PATTERN = re.compile(f"^{_PASSPORT_RE}$", re.ASCII)
+_UPI_PATTERN = re.compile(f"^{_UPI_RE}$", re.ASCII)
+_STANDALONE_PATTERN = re.compile(
+    rf"\A(?:(?P<phone>{_PHONE_RE})|(?P<aadhar>{_AADHAR_RE})"
+    rf"|(?P<passport>{_PASSPORT_RE})|(?P<upi>{_UPI_RE}))\Z",
+    re.ASCII,
+)
+
+_FIX_TRAIL1 = re.compile(r'"}\s*"$')
+_FIX_TRAIL2 = re.compile(r'"\s*"$')
+_FIX_UNQUOTED = re.compile(r':\s*(\d{4}-\d{2}-\d{2}|[A-Za-z_]+)(?=[},"])')
+_FIX_DBLQUOTE = re.compile(r'""(?=\s*[}\]])')
+_NAME_STRIP = str.maketrans("", "", "-'")
+_PINCODE = re.compile(r"\b\d{6}\b")
+_DIGIT_SET = frozenset("0123456789")
+_BATCH_SIZE = 1000
+_PARALLEL_MIN_BYTES = 32 << 20
+_PII_KEYS = frozenset(
+    {
+        "phone",
+        "contact",
+        "aadhar",
+        "passport",
+        "upi_id",
+        "name",
+        "email",
+        "address",
+        "device_id",
+        "ip_address",
+    }
+)
+_ADDRESS_KEYWORDS = ("road", "street", "lane", "avenue", "nagar", "colony", "park")
+
+_ADDR_KEYWORDS = re.compile("|".join(_ADDRESS_KEYWORDS), re.I)
+_ADDR_AUTOMATON: Any = None
+if ahocorasick is not None:
+    _ADDR_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _ADDRESS_KEYWORDS:
+        _ADDR_AUTOMATON.add_word(_keyword, _keyword)
+    _ADDR_AUTOMATON.make_automaton()
+
+
+def _has_address_keyword(value: str) -> bool:
+    if _ADDR_AUTOMATON is not None:
+        for _ in _ADDR_AUTOMATON.iter(value.lower()):
+            return True
+        return False
+    return _ADDR_KEYWORDS.search(value) is not None
+
+
+def _strip_values(record: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        k: (v if isinstance(v, str) else str(v)).strip()
+        for k, v in record.items()
+        if v
+    }
+
+
+def _mask_default(value_str: str) -> str:
+    return "[REDACTED_PII]"
+
+
+def _mask_phone(value_str: str) -> str:
+    if _PHONE_PATTERN.match(value_str):
+        return f"{value_str[:2]}XXXXXX{value_str[-2:]}"
+    return "[REDACTED_PII]"
+
+
+def _mask_aadhar(value_str: str) -> str:
+    if _AADHAR_PATTERN.match(value_str):
+        return f"{value_str[:4]}XXXX{value_str[-4:]}"
+    return "[REDACTED_PII]"
+
+
+def _mask_email(value_str: str) -> str:
+    parts = value_str.split("@")
+    if len(parts) == 2:
+        local = parts[0]
+        if len(local) > 2:
+            masked_local = local[:2] + "XXX"
+        else:
+            masked_local = "XXX"
+        return f"{masked_local}@{parts[1]}"
+    return "[REDACTED_PII]"
+
+
+def _mask_name(value_str: str) -> str:
+    parts = value_str.split()
+    if len(parts) >= 2:
+        first = parts[0]
+        last = parts[-1]
+        masked_first = first[0] + "XXX" if first else "XXX"
+        masked_last = last[0] + "XXXX" if last else "XXXX"
+        return f"{masked_first} {masked_last}"
+    return "[REDACTED_PII]"
+
+
+def _mask_address(value_str: str) -> str:
+    if len(value_str) > 15:
+        return value_str[:10] + "... [REDACTED]"
+    return "[REDACTED_PII]"
+
+
+def _mask_upi(value_str: str) -> str:
+    parts = value_str.split("@")
+    if len(parts) == 2:
+        user_part = parts[0]
+        if len(user_part) > 3:
+            masked_user = user_part[:3] + "XXX"
+        else:
+            masked_user = "XXX"
+        return f"{masked_user}@{parts[1]}"
+    return "[REDACTED_PII]"
+
+
+def _mask_passport(value_str: str) -> str:
+    if _PASSPORT_PATTERN.match(value_str):
+        return f"{value_str[0]}XXX{value_str[-4:]}"
+    return "[REDACTED_PII]"
 
 
 class PIIDetector:
-    def __init__(self):
-        self.phone_pattern = re.compile(r"^\d{10}$")
-        self.aadhar_pattern = re.compile(r"^\d{12}$")
-        self.passport_pattern = re.compile(r"^[A-Z]\d{7}$")
-        self.upi_pattern = re.compile(r"^[\w.-]+@[\w.-]+$|^\d{10}@\w+$")
+    __slots__ = (
+        "phone_pattern",
+        "aadhar_pattern",
+        "passport_pattern",
+        "upi_pattern",
+        "email_pattern",
+        "_email_match",
+        "_standalone_match",
+        "_standalone_groups",
+        "_maskers",
+    )
+
+    def __init__(self) -> None:
+        self.phone_pattern = _PHONE_PATTERN
+        self.aadhar_pattern = _AADHAR_PATTERN
+        self.passport_pattern = _PASSPORT_PATTERN
+        self.upi_pattern = _UPI_PATTERN
         self.email_pattern = re.compile(
-            r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$"
+            r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$", re.ASCII
         )
+        self._email_match = self.email_pattern.match
+        self._standalone_match = _STANDALONE_PATTERN.match
+        self._standalone_groups = {
+            "phone": "phone",
+            "contact": "phone",
+            "aadhar": "aadhar",
+            "passport": "passport",
+            "upi_id": "upi",
+        }
+        self._maskers: Dict[str, Callable[[str], str]] = {
+            "phone": _mask_phone,
+            "contact": _mask_phone,
+            "aadhar": _mask_aadhar,
+            "email": _mask_email,
+            "name": _mask_name,
+            "address": _mask_address,
+            "upi_id": _mask_upi,
+            "passport": _mask_passport,
+        }
 
     def is_standalone_pii(self, key: str, value: Any) -> bool:
         if not value:
             return False
 
-        value_str = str(value).strip()
-        if key in ["phone", "contact"]:
-            return self.phone_pattern.match(value_str) is not None
-        if key == "aadhar":
-            return self.aadhar_pattern.match(value_str) is not None
-        if key == "passport":
-            return self.passport_pattern.match(value_str) is not None
-        if key == "upi_id":
-            return self.upi_pattern.match(value_str) is not None
-        return False
+        return self._is_standalone_pii_str(key, str(value).strip())
+
+    def _is_standalone_pii_str(self, key: str, value_str: str) -> bool:
+        group = self._standalone_groups.get(key)
+        if group is None:
+            return False
+        match = self._standalone_match(value_str)
+        return match is not None and match.lastgroup == group
 
     def is_full_name(self, value: str) -> bool:
         if not isinstance(value, str):
             return False
         
         parts = value.strip().split()
-        if len(parts) >= 2:
-            return all(
-                part.replace("-", "").replace("'", "").isalpha() for part in parts
-            )
-        return False
+        if len(parts) < 2:
+            return False
+        for part in parts:
+            if not part.translate(_NAME_STRIP).isalpha():
+                return False
+        return True
 
     def is_physical_address(self, value: str) -> bool:
         if not isinstance(value, str):
             return False
 
-        value_lower = value.lower()
-        has_number = bool(re.search(r"\d+", value))
+        has_number = not _DIGIT_SET.isdisjoint(value)
         has_comma = "," in value
         word_count = len(value.split()) >= 5
-        has_pincode = bool(re.search(r"\b\d{6}\b", value))
-        address_keywords = [
-            "road",
-            "street",
-            "lane",
-            "avenue",
-            "nagar",
-            "colony",
-            "park",
-        ]
-        has_keyword = any(keyword in value_lower for keyword in address_keywords)
+        has_pincode = _PINCODE.search(value) is not None
+        has_keyword = _has_address_keyword(value)
 
         return (has_number and has_comma and word_count) or (
             has_pincode and has_keyword
         )
 
     def detect_combinatorial_pii(self, data: Dict[str, Any]) -> Tuple[bool, List[str]]:
-        found_pii = []
-
-        for key, value in data.items():
-            if not value:
-                continue
-
-            value_str = str(value).strip()
-            if key == "name" and self.is_full_name(value_str):
+        return self._detect_combinatorial_pii_str(_strip_values(data))
+
+    def _detect_combinatorial_pii_str(
+        self, stripped: Dict[str, str]
+    ) -> Tuple[bool, List[str]]:
+        found_pii: List[str] = []
+        name_str = stripped.get("name")
+        email_str = stripped.get("email")
+        has_name = name_str is not None and self.is_full_name(name_str)
+        has_email = email_str is not None and bool(self._email_match(email_str))
+
+        for key, value_str in stripped.items():
+            if key == "name" and has_name:
                 found_pii.append("name")
-            elif key == "email" and self.email_pattern.match(value_str):
+            elif key == "email" and has_email:
                 found_pii.append("email")
             elif key == "address" and self.is_physical_address(value_str):
                 found_pii.append("address")
-            elif key in ["device_id", "ip_address"] and value:
-                user_context_keys = {"name", "email"}
-                if any(k in data and data[k] for k in user_context_keys):
-                    if ("name" in data and self.is_full_name(str(data["name"]))) or (
-                        "email" in data and self.email_pattern.match(str(data["email"]))
-                    ):
-                        found_pii.append(key)
+            elif key in ["device_id", "ip_address"] and (has_name or has_email):
+                found_pii.append(key)
 
         return len(found_pii) >= 2, found_pii
 
@@ -93,142 +295,166 @@ class PIIDetector:
         if not value:
             return value
 
-        value_str = str(value).strip()
-        if key in ["phone", "contact"]:
-            if len(value_str) == 10 and value_str.isdigit():
-                return f"{value_str[:2]}XXXXXX{value_str[-2:]}"
-        if key == "aadhar":
-            if len(value_str) == 12 and value_str.isdigit():
-                return f"{value_str[:4]}XXXX{value_str[-4:]}"
-        if key == "email" and "@" in value_str:
-            parts = value_str.split("@")
-            if len(parts) == 2:
-                local = parts[0]
-                if len(local) > 2:
-                    masked_local = local[:2] + "XXX"
-                else:
-                    masked_local = "XXX"
-                return f"{masked_local}@{parts[1]}"
-
-        if key == "name":
-            parts = value_str.split()
-            if len(parts) >= 2:
-                first = parts[0]
-                last = parts[-1]
-                masked_first = first[0] + "XXX" if first else "XXX"
-                masked_last = last[0] + "XXXX" if last else "XXXX"
-                return f"{masked_first} {masked_last}"
-            
-        if key == "address":
-            if len(value_str) > 15:
-                return value_str[:10] + "... [REDACTED]"
-
-        if key == "upi_id":
-            if "@" in value_str:
-                parts = value_str.split("@")
-                if len(parts) == 2:
-                    user_part = parts[0]
-                    if len(user_part) > 3:
-                        masked_user = user_part[:3] + "XXX"
-                    else:
-                        masked_user = "XXX"
-                    return f"{masked_user}@{parts[1]}"
-
-        if key == "passport":
-            if (
-                len(value_str) == 8
-                and value_str[0].isalpha()
-                and value_str[1:].isdigit()
-            ):
-                return f"{value_str[0]}XXX{value_str[-4:]}"
-
-        return "[REDACTED_PII]"
+        return self._mask_value_str(key, str(value).strip())
+
+    def _mask_value_str(self, key: str, value_str: str) -> str:
+        return self._maskers.get(key, _mask_default)(value_str)
 
     def process_record(self, record: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        if _PII_KEYS.isdisjoint(record.keys()):
+            return record, False
+
         is_pii = False
-        redacted_data = {}
+        redacted_data: Dict[str, Any] = {}
+        stripped = _strip_values(record)
 
         for key, value in record.items():
-            if value and self.is_standalone_pii(key, value):
+            if value and self._is_standalone_pii_str(key, stripped[key]):
                 is_pii = True
-                redacted_data[key] = self.mask_value(key, str(value))
+                redacted_data[key] = self._mask_value_str(key, stripped[key])
             else:
                 redacted_data[key] = value
 
         if not is_pii:
-            has_combinatorial, found_fields = self.detect_combinatorial_pii(record)
+            has_combinatorial, found_fields = self._detect_combinatorial_pii_str(
+                stripped
+            )
             if has_combinatorial:
                 is_pii = True
                 for field in found_fields:
-                    if field in record and record[field]:
-                        redacted_data[field] = self.mask_value(
-                            field, str(record[field])
-                        )
+                    redacted_data[field] = self._mask_value_str(field, stripped[field])
 
         return redacted_data, is_pii
 
-def format_json_for_csv(data: Dict[str, Any]) -> str:
-    json_str = json.dumps(data, separators=(",", ": "))
-    return json_str.replace('"', '""')
+_BatchResult = Tuple[List[Tuple[str, str, Any]], int, int]
+
 
-def main(input_file: str):
+def _process_batch(rows: List[Tuple[str, str]]) -> _BatchResult:
     detector = PIIDetector()
+    results: List[Tuple[str, str, Any]] = []
+    records_processed = 0
+    pii_detected = 0
+
+    for record_id, data_json in rows:
+        try:
+            data, dumps = _loads(data_json)
+            redacted_data, is_pii = detector.process_record(data)
+            records_processed += 1
+            if is_pii:
+                pii_detected += 1
+                results.append((record_id, dumps(redacted_data), True))
+            else:
+                results.append((record_id, data_json, False))
+
+        except json.JSONDecodeError as e:
+            print(f"Error in the JSON record at {record_id}, attempting to fix")
+
+            s = _FIX_TRAIL1.sub('"}', data_json.strip())
+            s = _FIX_TRAIL2.sub('"', s)
+            s = _FIX_UNQUOTED.sub(r': "\1"', s)
+            s = _FIX_DBLQUOTE.sub('"', s)
+
+            try:
+                data, dumps = _loads(s)
+                redacted_data, is_pii = detector.process_record(data)
+                if is_pii:
+                    results.append((record_id, dumps(redacted_data), True))
+                else:
+                    results.append((record_id, s, False))
+            except Exception as inner_e:
+                print(f"Attempting to fix it failed: {record_id}: {inner_e}")
+                results.append((record_id, s, "Error"))
+
+        except Exception as e:
+            print(f"Error processing record {record_id}: {e}")
+            continue
+
+    return results, records_processed, pii_detected
+
+
+def _iter_records(
+    rows: Iterable[List[str]], rid: int, djs: Optional[int]
+) -> Iterator[Tuple[str, str]]:
+    # Without a data_json column every record is treated as "{}".
+    width = max(rid, -1 if djs is None else djs) + 1
+    for row in rows:
+        if len(row) < width:
+            continue
+        record_id = row[rid].strip()
+        data_json = "{}" if djs is None else row[djs].strip()
+        if not record_id or not data_json:
+            continue
+        yield record_id, data_json
+
+
+def _chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open_output(output_csv: str, compress: bool) -> TextIO:
+    if not compress:
+        return open(output_csv, "w", encoding="utf-8", newline="", buffering=1 << 20)
+    if zstandard is None:
+        raise RuntimeError("zstd output requires the zstandard package")
+    cctx = zstandard.ZstdCompressor(level=3)
+    raw = open(output_csv, "wb", buffering=1 << 20)
+    return io.TextIOWrapper(cctx.stream_writer(raw), encoding="utf-8", newline="")
+
+
+def main(
+    input_file: str, compress: bool = False, processes: Optional[int] = None
+) -> None:
     output_csv = "redacted_output_SaraswathideviS.csv"
+    if compress:
+        output_csv += ".zst"
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            first_line = f.readline().strip()
-        delimiter = "\t" if "\t" in first_line else ","
-        with open(input_file, "r", encoding="utf-8") as infile, open(
-            output_csv, "w", encoding="utf-8", newline=""
+        with open(input_file, "rb", buffering=1 << 20) as raw, _open_output(
+            output_csv, compress
         ) as csvfile:
-            infile.seek(0)
-            first_char = infile.read(1)
-            if first_char != "\ufeff":
-                infile.seek(0)
-            reader = csv.DictReader(infile, delimiter=delimiter)
-            header = "record_id,redacted_data_json,is_pii"
-            csvfile.write(header + "\n")
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(
+                        raw.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL
+                    )
+                except OSError:
+                    pass
+            if processes is None:
+                large = os.fstat(raw.fileno()).st_size >= _PARALLEL_MIN_BYTES
+                processes = (os.cpu_count() or 1) if large else 1
+            head = cast(io.BufferedReader, raw).peek(4096)[:4096]
+            first_line = head.split(b"\n", 1)[0]
+            delimiter = "\t" if b"\t" in first_line else ","
+            infile = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            reader = csv.reader(infile, delimiter=delimiter)
+            header = next(reader, None) or []
+            data_column = "data_json" if "data_json" in header else "Data_json"
+            records: Iterator[Tuple[str, str]] = iter(())
+            if "record_id" in header:
+                djs = header.index(data_column) if data_column in header else None
+                records = _iter_records(reader, header.index("record_id"), djs)
+
+            writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+            writer.writerow(("record_id", "redacted_data_json", "is_pii"))
             records_processed = 0
             pii_detected = 0
 
-            for row in reader:
-                record_id = row.get("record_id", row.get("record_id\ufeff", "")).strip()
-                data_json = row.get("data_json", row.get("Data_json", "{}")).strip()
-                if not record_id or not data_json:
-                    continue
-                try:
-                    data = json.loads(data_json)
-                    redacted_data, is_pii = detector.process_record(data)
-                    records_processed += 1
-                    if is_pii:
-                        pii_detected += 1
-                    formatted_json = format_json_for_csv(redacted_data)
-                    output_line = f'{record_id},"{formatted_json}",{is_pii}'
-                    csvfile.write(output_line + "\n")
-
-                except json.JSONDecodeError as e:
-                    print(f"Error in the JSON record at {record_id}, attempting to fix")
-                  
-                    s = re.sub(r'"}\s*"$', '"}', data_json.strip())
-                    s = re.sub(r'"\s*"$', '"', s)
-                    s = re.sub(r':\s*(\d{4}-\d{2}-\d{2}|[A-Za-z_]+)(?=[},"])', r': "\1"', s)
-                    s = re.sub(r'""(?=\s*[}\]])', '"', s)
-
-                    try:
-                        data = json.loads(s)
-                        redacted_data, is_pii = detector.process_record(data)
-                        formatted_json = format_json_for_csv(redacted_data)
-                        output_line = f'{record_id},"{formatted_json}",{is_pii}'
-                        csvfile.write(output_line + "\n")
-                    except Exception as inner_e:
-                        print(f"Attempting to fix it failed: {record_id}: {inner_e}")
-                        s_csv = s.replace('"', '""')
-                        output_line = f'{record_id},"{s_csv}",Error'
-                        csvfile.write(output_line + "\n")
-
-                except Exception as e:
-                    print(f"Error processing record {record_id}: {e}")
-                    continue
+            batches = _chunked(records, _BATCH_SIZE)
+            outputs: Iterator[_BatchResult]
+            with contextlib.ExitStack() as stack:
+                if processes > 1:
+                    pool = stack.enter_context(Pool(processes))
+                    outputs = pool.imap(_process_batch, batches)
+                else:
+                    outputs = map(_process_batch, batches)
+                for results, processed, detected in outputs:
+                    writer.writerows(results)
+                    records_processed += processed
+                    pii_detected += detected
 
     except FileNotFoundError:
         sys.exit(1)
@@ -244,7 +470,19 @@ def main(input_file: str):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    compress = "--zstd" in args
+    if compress:
+        args.remove("--zstd")
+    processes = None
+    if "--processes" in args:
+        i = args.index("--processes")
+        try:
+            processes = int(args[i + 1])
+        except (IndexError, ValueError):
+            sys.exit(1)
+        del args[i : i + 2]
+    if len(args) != 1:
         sys.exit(1)
 
-    main(sys.argv[1])
+    main(args[0], compress=compress, processes=processes)